@@ -1,7 +1,12 @@
 # Example on how to take one of the result file types that is supported
 # by MIKE 1D, and convert to res1d file. This example is converting
 # a MOUSE RR file (.crf) to res1d.
+#
+# Input and output file can be given on the command line:
+#   python Convert2Res1d.py [inputFile [outputFile]]
+# By default DemoBase.crf is converted to DemoBase-crf.res1d.
 
+import os
 import sys
 import clr
 
@@ -16,14 +21,26 @@ clr.AddReference("DHI.Mike1D.Generic")
 from DHI.Mike1D.ResultDataAccess import ResultData, ResultDataSearch
 from DHI.Mike1D.Generic import Connection
 
+inputFile = "DemoBase.crf"
+if len(sys.argv) > 1:
+    inputFile = sys.argv[1]
+
+# Output file name from input, e.g. DemoBase.crf -> DemoBase-crf.res1d
+inputRoot, inputExtension = os.path.splitext(inputFile)
+outputFile = inputRoot + "-" + inputExtension.lstrip(".") + ".res1d"
+if len(sys.argv) > 2:
+    outputFile = sys.argv[2]
+
 resultData = ResultData();
-resultData.Connection = Connection.Create("DemoBase.crf");
+resultData.Connection = Connection.Create(inputFile);
 resultData.Load();
 
-# For crf files, set Type to "" if None (null) - work-around for a bug
-for c in resultData.Catchments: 
-    if (c.Type is None): 
-        c.Type = "";
+# For crf files, set Type to "" if None (null) - work-around for a bug.
+# Other file types do not need it, so their catchments are not visited.
+if inputFile.lower().endswith(".crf"):
+    for c in resultData.Catchments: 
+        if (c.Type is None): 
+            c.Type = "";
 
-resultData.Connection = Connection.Create("DemoBase-crf.res1d");
+resultData.Connection = Connection.Create(outputFile);
 resultData.Save();
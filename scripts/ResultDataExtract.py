@@ -1,4 +1,17 @@
+import os
 import sys
+import ctypes
+import json
+import locale
+import math
+import struct
+from array import array
+from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+# IronPython indexes .NET arrays directly, pythonnet crosses into .NET per index
+isIronPython = sys.platform == 'cli'
 
 #region .NET imports
 
@@ -6,7 +19,10 @@ import clr
 
 clr.AddReference("System")
 import System
-from System import Array, StringComparer
+from System import Action, Array, Buffer, DateTime, Int64, IntPtr
+from System.Globalization import CultureInfo
+from System.Runtime.InteropServices import GCHandle, GCHandleType, Marshal
+from System.Threading.Tasks import Parallel
 
 # The SetupLatest method will make your script find the MIKE assemblies at runtime.
 # This is required for MIKE Version 2019 (17.0) and onwards. For previous versions, the
@@ -15,16 +31,14 @@ clr.AddReference("DHI.Mike.Install, Version=1.0.0.0, Culture=neutral, PublicKeyT
 from DHI.Mike.Install import MikeImport, MikeProducts
 products = list(MikeImport.InstalledProducts())
 product = products[0]
-MikeImport.Setup(product);
+MikeImport.Setup(product)
 
 clr.AddReference("DHI.Mike1D.ResultDataAccess")
 clr.AddReference("DHI.Mike1D.Generic")
-clr.AddReference("DHI.Generic.MikeZero.DFS")
-clr.AddReference("DHI.Generic.MikeZero.EUM")
-from DHI.Mike1D.ResultDataAccess import ResultData, ResultDataSearch, Filter, DataItemFilterName, ItemTypeGroup
+from DHI.Mike1D.ResultDataAccess import ResultData, ResultDataSearch, Filter, DataItemFilterName, DataItemFilterQuantity, ItemTypeGroup, Period
 from DHI.Mike1D.Generic import Diagnostics, Connection
-from DHI.Generic.MikeZero import eumUnit, eumItem, eumQuantity
-from DHI.Generic.MikeZero.DFS import DfsFactory, DfsBuilder, DfsSimpleType, DataValueType, StatType
+
+# DFS assemblies are only loaded when writing dfs0 files, see ExtractorDfs0
 
 #endregion .NET imports
 
@@ -32,7 +46,7 @@ from DHI.Generic.MikeZero.DFS import DfsFactory, DfsBuilder, DfsSimpleType, Data
 def PrintUsage():
     usageStr = """
 Usage: Extracts data from network result files to text file
-    ipy.exe ResultDataExtract.py resultFile.res1d output.txt [extractPoints]*
+    python.exe ResultDataExtract.py resultFile.res1d output.txt [extractPoints]*
 
 Where: ExtractPoints is one or more of:
     node:WaterLevel:116
@@ -53,15 +67,26 @@ Output file can have extensions:
     txt : Write text file output
     csv : Write text file output in csv format
     dfs0: Write dfs0 file output
+    bin : Write binary file output, float32 values, see ExtractorBin for layout
+    -   : Write txt, csv, dfs0 and bin output, e.g. out.- writes out.txt, out.csv,
+          out.dfs0 and out.bin
+
+Options can be placed anywhere after the script name:
+    --from time : Extract only time steps at or after time, e.g. 2020-01-01
+    --to time   : Extract only time steps at or before time, e.g. "2020-02-01 12:00"
+    --stride n  : Extract only every n'th time step of the result file, starting with
+                  its first time step, also when combined with --from
+    --fp16      : Round dfs0 values to half precision (about 3 significant digits).
+                  Values are still stored as float, but the file compresses better.
 
 Example:
-    ipy.exe ResultDataExtract.py DemoBase.res1d out.txt reach:WaterLevel:102l1:0 node:WaterLevel:116
+    python.exe ResultDataExtract.py DemoBase.res1d out.txt reach:WaterLevel:102l1:0 node:WaterLevel:116
 
 To check which nodes/reaches/catchments are available, leave out the rest
-    ipy.exe ResultDataExtract.py DemoBase.res1d out.txt reach
+    python.exe ResultDataExtract.py DemoBase.res1d out.txt reach
 
 To check which quantities are available on a node/reach/catchment, use '-' as quantity
-    ipy.exe ResultDataExtract.py DemoBase.res1d out.txt reach:-:VIDAA-NED
+    python.exe ResultDataExtract.py DemoBase.res1d out.txt reach:-:VIDAA-NED
 
 The ResultDataExtract supports a variety of network and RR result files, i.e
     res1d         : MIKE 1D network/RR result files
@@ -88,6 +113,7 @@ class OutputFileType(object):
     TXT = 'txt'
     CSV = 'csv'
     DFS0 = 'dfs0'
+    BIN = 'bin'
     ALL = '-'
 
 #endregion Enums
@@ -113,12 +139,32 @@ class ParsedArgument(object):
 class CommandLineParser(object):
     """Class for parsing command line arguments"""
 
+    # First letter of argument -> (lower case argument prefix, location type,
+    # argument may have chainage)
+    locationPrefixes = {
+        "r": ("reach", LocationType.REACH, True),
+        "n": ("node", LocationType.NODE, False),
+        "c": ("catchment", LocationType.CATCHMENT, False),
+    }
+
+    # Lower case output file extension -> output file type
+    outputFileTypes = {
+        ".txt": OutputFileType.TXT,
+        ".csv": OutputFileType.CSV,
+        ".dfs0": OutputFileType.DFS0,
+        ".bin": OutputFileType.BIN,
+    }
+
     def __init__(self, arguments):
         self.arguments = arguments
         self.parsedArguments = []
         self.resFileName = None
         self.outFileName = None
         self.outFileType = None
+        self.fromTime = None
+        self.toTime = None
+        self.timeStepSkippingNumber = 1
+        self.halfPrecision = False
 
         self.printUsage = False
         self.printAllQuantities = False
@@ -127,6 +173,10 @@ class CommandLineParser(object):
         self.Parse()
 
     def Parse(self):
+        if not self.ParseOptions():
+            self.cannotHandleArgument = True
+            return
+
         arguments = self.arguments
         argumentsCount = len(arguments)
 
@@ -143,19 +193,16 @@ class CommandLineParser(object):
         self.ParseOutputFileName()
 
         # Parse command line arguments
-        for i in range(3, argumentsCount):
-            argument = arguments[i]
+        for i, argument in enumerate(arguments[3:], 3):
+            # Only the part that can hold a prefix is lower cased
+            argumentHead = argument[:9].lower()
             cannotHandleArgument = False
             parsedArgument = None
 
-            if argument.lower().startswith("reach"):
-                parsedArgument = self.ParseLocation(i, LocationType.REACH, hasChainage=True)
-
-            elif argument.lower().startswith("node"):
-                parsedArgument = self.ParseLocation(i, LocationType.NODE)
-
-            elif argument.lower().startswith("catchment"):
-                parsedArgument = self.ParseLocation(i, LocationType.CATCHMENT)
+            locationPrefix = self.locationPrefixes.get(argumentHead[:1])
+            if locationPrefix is not None and argumentHead.startswith(locationPrefix[0]):
+                locationType, hasChainage = locationPrefix[1:]
+                parsedArgument = self.ParseLocation(i, argument, locationType, hasChainage)
 
             else:
                 print("Could not handle argument %i, %s" % (i, argument))
@@ -170,31 +217,90 @@ class CommandLineParser(object):
                 break
 
 
+    def ParseOptions(self):
+        """
+        Parse options of the form --name value or --flag, and remove them
+        from the arguments. Returns False if an option is invalid.
+        """
+        allArguments = self.arguments
+        argumentsCount = len(allArguments)
+        arguments = []
+        i = 0
+        while i < argumentsCount:
+            argument = allArguments[i]
+            if not argument.startswith("--"):
+                arguments.append(argument)
+                i += 1
+                continue
+
+            name = argument[2:].lower()
+            if name == "fp16":
+                self.halfPrecision = True
+                i += 1
+                continue
+
+            if i + 1 >= argumentsCount:
+                print("Option %s requires a value" % argument)
+                return False
+            value = allArguments[i+1]
+            i += 2
+
+            if name == "from":
+                self.fromTime = self.ParseTime(argument, value)
+                if self.fromTime is None:
+                    return False
+
+            elif name == "to":
+                self.toTime = self.ParseTime(argument, value)
+                if self.toTime is None:
+                    return False
+
+            elif name == "stride":
+                self.timeStepSkippingNumber = self.ParseStride(argument, value)
+                if self.timeStepSkippingNumber is None:
+                    return False
+
+            else:
+                print("Unknown option %s" % argument)
+                return False
+
+        self.arguments = arguments
+        return True
+
+    def ParseTime(self, option, value):
+        try:
+            return DateTime.Parse(value, CultureInfo.InvariantCulture)
+        except:
+            print("Option %s: Could not parse time '%s'" % (option, value))
+            return None
+
+    def ParseStride(self, option, value):
+        try:
+            stride = int(value)
+        except ValueError:
+            stride = 0
+        if stride < 1:
+            print("Option %s: Stride must be a positive integer, got '%s'" % (option, value))
+            return None
+        return stride
+
     def ParseResultFileName(self):
         self.resFileName = self.arguments[1]
 
     def ParseOutputFileName(self):
         outFileName = self.arguments[2]
 
-        # Figure out output file type from extension
-        outFileType = OutputFileType.TXT
-        if outFileName.lower().endswith(".txt"):
-            outFileType = OutputFileType.TXT
-
-        if outFileName.lower().endswith(".csv"):
-            outFileType = OutputFileType.CSV
-
-        if outFileName.lower().endswith(".dfs0"):
-            outFileType = OutputFileType.DFS0
-
-        if outFileName.lower().endswith("-"):
+        # Figure out output file type from extension, text file by default
+        if outFileName.endswith("-"):
             outFileType = OutputFileType.ALL
+        else:
+            extension = os.path.splitext(outFileName)[1].lower()
+            outFileType = self.outputFileTypes.get(extension, OutputFileType.TXT)
 
         self.outFileName = outFileName
         self.outFileType = outFileType
 
-    def ParseLocation(self, i, locationType, hasChainage=False):
-        argument = self.arguments[i]
+    def ParseLocation(self, i, argument, locationType, hasChainage=False):
         quantityId = None
         locationId = None
         chainage = Constants.ALL_CHAINAGES
@@ -202,7 +308,7 @@ class CommandLineParser(object):
         printQuantities = False
         cannotHandleArgument = False
 
-        parts = self.GetPartsOfArgument(argument, locationType)
+        splitChar, parts = self.GetPartsOfArgument(argument, locationType, hasChainage)
         partsCount = len(parts)
 
         if partsCount < 3:
@@ -236,13 +342,19 @@ class CommandLineParser(object):
 
         return ParsedArgument(locationType, quantityId, locationId, chainage, printAllLocations, printQuantities, cannotHandleArgument)
 
-    def GetPartsOfArgument(self, argument, locationType):
+    def GetPartsOfArgument(self, argument, locationType, hasChainage=False):
+        """
+        Split argument into type, quantity, id and optionally chainage.
+        The character following the location type is the split character.
+        """
+        splitChar = None
         parts = []
         splitCharPosition = len(locationType)
         if len(argument) > splitCharPosition:
             splitChar = argument[splitCharPosition]
-            parts = argument.split(splitChar, splitCharPosition-1)
-        return parts
+            maxSplit = 3 if hasChainage else 2
+            parts = argument.split(splitChar, maxSplit)
+        return splitChar, parts
 
     def IsFloat(self, value):
         try:
@@ -255,13 +367,39 @@ class CommandLineParser(object):
 
 #region Result finder
 
+def ToPythonArray(values, typecode='f'):
+    """
+    Copy a .NET float or double array into a new Python array of type
+    'f' or 'd' with a single memory copy. With IronPython the .NET array
+    is already indexed directly, and is returned as is.
+    """
+    if isIronPython:
+        return values
+
+    pythonArray = array(typecode, [0.0]) * values.Length
+    address, length = pythonArray.buffer_info()
+    Marshal.Copy(values, 0, IntPtr(Int64(address)), length)
+    return pythonArray
+
+
 class DataEntry(object):
     """Class storing a Mike1D data item and a corresponding element index"""
 
+    __slots__ = ('dataItem', 'elementIndex')
+
     def __init__(self, dataItem, elementIndex):
         self.dataItem = dataItem
         self.elementIndex = elementIndex
 
+    def GetTimeSeries(self):
+        """
+        Get values of all time steps for the element.
+        The full time series is fetched in one call.
+        """
+        # Copied into a Python array, so indexing it afterwards
+        # stays on the Python side
+        return ToPythonArray(self.dataItem.CreateTimeSeriesData(self.elementIndex))
+
 
 class ResultFinder(object):
     """Class storing a Mike1D data item and a corresponding element index"""
@@ -273,6 +411,19 @@ class ResultFinder(object):
         self.resultData.Connection = Connection.Create(filename)
         self.useFilter = useFilter
         self.outputDataItem = outputDataItem
+        # Quantity lookup per IRes1DDataSet, see FindQuantity. Keyed by the
+        # data set itself, pythonnet may wrap the same data set in new objects.
+        self.quantityCache = {}
+        # Grid point chainages per reach, see GetGridPointChainages
+        self.gridPointChainageCache = {}
+        # Grid point chainages per reach IDataItem, see GetChainages
+        self.chainageCache = {}
+        # Searcher results per location type and id, see FindLocation
+        self.locationCache = {}
+        # Data entries per argument, see FindQuantityInLocation
+        self.quantityInLocationCache = {}
+        # Ticks of the times, see GetTimes
+        self.timeTicks = None
 
         if useFilter:
             self.SetupFilter()
@@ -294,14 +445,45 @@ class ResultFinder(object):
         self.dataFilter = Filter()
         self.dataSubFilter = DataItemFilterName(self.resultData)
         self.dataFilter.AddDataItemFilter(self.dataSubFilter)
+        # Created when the first quantity is added, see AddQuantity
+        self.dataQuantityFilter = None
 
         self.resultData.Parameters.Filter = self.dataFilter
 
+    def SetPeriod(self, fromTime=None, toTime=None):
+        """
+        Load only time steps from fromTime to toTime, both included.
+        Without fromTime or toTime the period is open at that end.
+        """
+        if not self.useFilter:
+            return
+        if fromTime is None and toTime is None:
+            return
+
+        startTime = fromTime if fromTime is not None else DateTime.MinValue
+        endTime = toTime if toTime is not None else DateTime.MaxValue
+        self.dataFilter.Periods.Add(Period(startTime, endTime))
+
+    def SetLoadStep(self, loadStep):
+        """
+        Load only every loadStep'th time step. Time steps are counted
+        from the first time step in the file, not from the start of the
+        period set by SetPeriod.
+        """
+        if not self.useFilter:
+            return
+
+        self.dataFilter.LoadStep = loadStep
+
     def Load(self):
         """
-        Load the data from the result file into memory
+        Load the data from the result file into memory. With a filter
+        without any locations there is no data to load.
         """
         if self.useFilter:
+            dataSubFilter = self.dataSubFilter
+            if dataSubFilter.Reaches.Count + dataSubFilter.Nodes.Count + dataSubFilter.Catchments.Count == 0:
+                return
             self.resultData.LoadData(self.diagnostics)
         else:
             self.resultData.Load(self.diagnostics)
@@ -317,27 +499,100 @@ class ResultFinder(object):
             self.AddCatchment(locationId)
 
     def AddReach(self, reachId):
-        self.dataSubFilter.Reaches.Add(reachId)
+        if not self.dataSubFilter.Reaches.Contains(reachId):
+            self.dataSubFilter.Reaches.Add(reachId)
 
     def AddNode(self, nodeId):
-        self.dataSubFilter.Nodes.Add(nodeId)
+        if not self.dataSubFilter.Nodes.Contains(nodeId):
+            self.dataSubFilter.Nodes.Add(nodeId)
 
     def AddCatchment(self, catchmentId):
-        self.dataSubFilter.Catchments.Add(catchmentId)
+        if not self.dataSubFilter.Catchments.Contains(catchmentId):
+            self.dataSubFilter.Catchments.Add(catchmentId)
+
+    def AddQuantity(self, quantityId):
+        """
+        Load only data items of the added quantities, in addition to the
+        location filter. Quantity ids are compared case insensitive, the
+        matching quantities of the file are added to the filter.
+        """
+        if not self.useFilter:
+            return
+
+        quantityId = quantityId.lower()
+        for quantity in self.resultData.Quantities:
+            if quantity.Id.lower() != quantityId:
+                continue
+            if self.dataQuantityFilter is None:
+                # The result data filter includes only data items
+                # included by both the name and the quantity filter
+                self.dataQuantityFilter = DataItemFilterQuantity()
+                self.dataFilter.AddDataItemFilter(self.dataQuantityFilter)
+            if not self.dataQuantityFilter.Quantities.Contains(quantity):
+                self.dataQuantityFilter.Quantities.Add(quantity)
 
     def FindQuantity(self, dataSet, quantityId):
         """
-        Find a given quantity from an IRes1DDataSet
+        Find a given quantity from an IRes1DDataSet. Quantity ids are
+        compared case insensitive. The data items of a data set are
+        indexed on first use, later lookups are a dictionary lookup.
         """
-        numItems = dataSet.DataItems.Count
-        dataItems = list(dataSet.DataItems)
-        for j in range(numItems):
-            dataItem = dataItems[j]
-            if StringComparer.OrdinalIgnoreCase.Equals(dataItem.Quantity.Id, quantityId):
-                return dataItem
-        return None
+        return self.GetQuantities(dataSet).get(quantityId.lower())
+
+    def GetQuantities(self, dataSet):
+        """
+        Get data items of an IRes1DDataSet by lower case quantity id
+        """
+        quantities = self.quantityCache.get(dataSet)
+        if quantities is None:
+            # Index all quantities of the data set in one pass,
+            # first data item wins if a quantity id appears twice
+            quantities = {}
+            for dataItem in dataSet.DataItems:
+                quantities.setdefault(dataItem.Quantity.Id.lower(), dataItem)
+            self.quantityCache[dataSet] = quantities
+        return quantities
+
+    def FindLocation(self, locationType, locationId):
+        """
+        Find reaches, node or catchment with the given id. Each location
+        is searched for only once, repeated requests use the cached result.
+        """
+        key = (locationType, locationId)
+        if key in self.locationCache:
+            return self.locationCache[key]
+
+        location = None
+        if locationType == LocationType.REACH:
+            location = list(self.searcher.FindReaches(locationId))
+
+        if locationType == LocationType.NODE:
+            location = self.searcher.FindNode(locationId)
+
+        if locationType == LocationType.CATCHMENT:
+            location = self.searcher.FindCatchment(locationId)
+
+        self.locationCache[key] = location
+        return location
+
+    def FindReaches(self, reachId):
+        return self.FindLocation(LocationType.REACH, reachId)
+
+    def FindNode(self, nodeId):
+        return self.FindLocation(LocationType.NODE, nodeId)
+
+    def FindCatchment(self, catchId):
+        return self.FindLocation(LocationType.CATCHMENT, catchId)
 
     def FindQuantityInLocation(self, locationType, quantityId, locationId, chainage=Constants.ALL_CHAINAGES):
+        """
+        Find data entries of a quantity in a location. Repeated arguments
+        use the cached result, so each argument is searched for only once.
+        """
+        key = (locationType, quantityId, locationId, chainage)
+        if key in self.quantityInLocationCache:
+            return self.quantityInLocationCache[key]
+
         data = None
 
         if locationType == LocationType.REACH:
@@ -352,19 +607,21 @@ class ResultFinder(object):
         if locationType == LocationType.CATCHMENT:
             data = self.FindCatchmentQuantity(quantityId, locationId)
 
+        self.quantityInLocationCache[key] = data
         return data
 
     def FindReachQuantityAllChainages(self, quantityId, reachId):
         # There can be more than one reach with this reachId, check all
-        reaches = self.searcher.FindReaches(reachId)
-        if reaches.Count == 0:
+        reaches = self.FindReaches(reachId)
+        if len(reaches) == 0:
             print("Could not find reach '%s'"  % (reachId))
             return None
 
         dataEntries = []
+        quantityKey = quantityId.lower()
         # All elements of all reaches having that quantity
         for reach in reaches:
-            dataItem = self.FindQuantity(reach, quantityId)
+            dataItem = self.GetQuantities(reach).get(quantityKey)
             if dataItem == None:
                 continue
 
@@ -383,38 +640,86 @@ class ResultFinder(object):
         The grid point closest to the given chainage is used.
         """
         # There can be more than one reach with this reachId, check all
-        reaches = self.searcher.FindReaches(reachId)
-        if reaches.Count == 0:
+        reaches = self.FindReaches(reachId)
+        if len(reaches) == 0:
             print("Could not find reach '%s'"  % (reachId))
             return None
 
         # Find grid point closest to given chainage
-        minDist = 999999
+        minDist = float('inf')
         minDataItem = None
         minElmtIndex = -1
+        quantityKey = quantityId.lower()
         for reach in reaches:
-            dataItem = self.FindQuantity(reach, quantityId)
+            dataItem = self.GetQuantities(reach).get(quantityKey)
             if dataItem != None:
-                # Loop over all grid points in reach dataItem
-                for j in range(dataItem.NumberOfElements):
-                    indexList = list(dataItem.IndexList)
-                    gridPoints = list(reach.GridPoints)
-                    dist = abs(gridPoints[indexList[j]].Chainage-chainage)
-                    if dist < minDist:
-                        minDist = dist
-                        minDataItem = dataItem
-                        minElmtIndex = j
+                chainages, isSorted = self.GetChainages(reach, dataItem)
+                j = self.FindClosestChainageIndex(chainages, chainage, isSorted)
+                if j < 0:
+                    continue
+                dist = abs(chainages[j]-chainage)
+                if dist < minDist:
+                    minDist = dist
+                    minDataItem = dataItem
+                    minElmtIndex = j
 
         if minDataItem == None:
             print("Could not find quantity '%s' on reach '%s'."  % (quantityId, reachId))
+            return []
+
+        return [self.ConvertDataItemElementToList(minDataItem, minElmtIndex)]
+
+    def GetChainages(self, reach, dataItem):
+        """
+        Get chainages of the elements of a reach data item, and whether
+        they are sorted. The chainages are looked up once per data item and cached.
+        """
+        cached = self.chainageCache.get(dataItem)
+        if cached is None:
+            gridPointChainages = self.GetGridPointChainages(reach)
+            chainages = array('d', [gridPointChainages[gridPointIndex] for gridPointIndex in dataItem.IndexList])
+            isSorted = all(chainages[j] <= chainages[j+1] for j in range(len(chainages) - 1))
+            cached = (chainages, isSorted)
+            self.chainageCache[dataItem] = cached
+        return cached
+
+    def GetGridPointChainages(self, reach):
+        """
+        Get chainages of all grid points of a reach. The grid points are
+        looked up once per reach and shared by all quantities on the reach.
+        """
+        gridPointChainages = self.gridPointChainageCache.get(reach)
+        if gridPointChainages is None:
+            gridPointChainages = [gridPoint.Chainage for gridPoint in reach.GridPoints]
+            self.gridPointChainageCache[reach] = gridPointChainages
+        return gridPointChainages
+
+    def FindClosestChainageIndex(self, chainages, chainage, isSorted=True):
+        """
+        Find index of the chainage closest to the given chainage, or -1 if
+        there are no chainages. Chainages along a reach are normally sorted,
+        and then a binary search is used.
+        """
+        count = len(chainages)
+        if count == 0:
+            return -1
+
+        if not isSorted:
+            # Single pass in the builtin min, first index wins on ties
+            return min(range(count), key=lambda j: abs(chainages[j] - chainage))
 
-        return [self.ConvertDataItemElementToList(dataItem, minElmtIndex)]
+        j = bisect_left(chainages, chainage)
+        if j == count:
+            return count - 1
+        if j > 0 and chainage - chainages[j-1] <= chainages[j] - chainage:
+            return j - 1
+        return j
 
     def FindNodeQuantity(self, quantityId, nodeId):
         """
         Find a given quantity on the node with the given nodeId
         """
-        node = self.searcher.FindNode(nodeId)
+        node = self.FindNode(nodeId)
 
         if node == None:
             print("Could not find node '%s'"  % (nodeId))
@@ -423,6 +728,7 @@ class ResultFinder(object):
         dataItem = self.FindQuantity(node, quantityId)
         if dataItem == None:
             print("Could not find quantity '%s' in node '%s'."  % (quantityId, nodeId))
+            return []
 
         return [self.ConvertDataItemElementToList(dataItem, 0)]
 
@@ -430,7 +736,7 @@ class ResultFinder(object):
         """
         Find a given quantity on the catchment with the given catchId
         """
-        catchment = self.searcher.FindCatchment(catchId)
+        catchment = self.FindCatchment(catchId)
         if catchment == None:
             print("Could not find catchment '%s'"  % (catchId))
             return None
@@ -438,6 +744,7 @@ class ResultFinder(object):
         dataItem = self.FindQuantity(catchment, quantityId)
         if dataItem == None:
             print("Could not find quantity '%s' in catchment '%s'."  % (quantityId, catchId))
+            return []
 
         return [self.ConvertDataItemElementToList(dataItem, 0)]
 
@@ -445,30 +752,29 @@ class ResultFinder(object):
         """
         Print out quantities on IRes1DDataSet
         """
-        print("Available quantity IDs:")
         resultData = self.resultData
-        quantities = list(resultData.Quantities)
-        for quantity in quantities:
-            print("  %s"  % (quantity.Id))
+        lines = ["Available quantity IDs:"]
+        for quantity in resultData.Quantities:
+            lines.append("  %s"  % (quantity.Id))
+        self.PrintLines(lines)
 
     def PrintQuantities(self, locationType, locationId, chainage=0):
         dataSet = None
 
         if locationType == LocationType.REACH:
-            dataSet = self.searcher.FindReaches(locationId)[0]
+            reaches = self.FindReaches(locationId)
+            dataSet = reaches[0] if len(reaches) > 0 else None
 
         if locationType == LocationType.NODE:
-            dataSet = self.searcher.FindNode(locationId)
+            dataSet = self.FindNode(locationId)
 
         if locationType == LocationType.CATCHMENT:
-            dataSet = self.searcher.FindCatchment(locationId)
+            dataSet = self.FindCatchment(locationId)
 
         if dataSet is None:
             return
 
-        dataItems = list(dataSet.DataItems)
-        for dataItem in dataItems:
-            print("'%s'" % dataItem.Quantity.Id)
+        self.PrintLines(["'%s'" % dataItem.Quantity.Id for dataItem in dataSet.DataItems])
 
     def PrintAllLocations(self, locationType):
         if locationType == LocationType.NODE:
@@ -482,28 +788,39 @@ class ResultFinder(object):
 
     def PrintAllReaches(self):
         resultData = self.resultData
-        for j in range (resultData.Reaches.Count):
-            reach = list(resultData.Reaches)[j]
-            gridPoints = list(reach.GridPoints)
+        lines = []
+        for reach in resultData.Reaches:
+            # Only the first and last grid point are needed
+            gridPoints = reach.GridPoints
             startChainage = gridPoints[0].Chainage
-            endChainage = gridPoints[-1].Chainage
-            print("'%-30s (%9.2f - %9.2f)'" % (reach.Name, startChainage, endChainage))
+            endChainage = gridPoints[gridPoints.Count - 1].Chainage
+            lines.append("'%-30s (%9.2f - %9.2f)'" % (reach.Name, startChainage, endChainage))
+        self.PrintLines(lines)
 
     def PrintAllNodes(self):
         resultData = self.resultData
-        for j in range (resultData.Nodes.Count):
-            node = list(resultData.Nodes)[j]
-            print("'%s'" % node.Id)
+        lines = []
+        for node in resultData.Nodes:
+            lines.append("'%s'" % node.Id)
+        self.PrintLines(lines)
 
     def PrintAllCatchments(self):
         resultData = self.resultData
-        for j in range (resultData.Catchments.Count):
-            catchment = list(resultData.Catchments)[j]
-            print("'%s'" % catchment.Id)
+        lines = []
+        for catchment in resultData.Catchments:
+            lines.append("'%s'" % catchment.Id)
+        self.PrintLines(lines)
+
+    def PrintLines(self, lines):
+        """
+        Print lines of a listing with a single write to standard output
+        """
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
 
     def ConvertDataItemElementToList(self, dataItem, elementIndex):
         """
-        Convert dataItem element to list of numbers.
+        Convert dataItem element to a float array of numbers, one per time step.
         """
         if self.outputDataItem:
             return DataEntry(dataItem, elementIndex)
@@ -511,20 +828,20 @@ class ResultFinder(object):
         if dataItem is None:
             return None
 
-        data = []
-        for j in range(dataItem.NumberOfTimeSteps):
-            data.append(dataItem.GetValue(j, elementIndex))
-        return data
+        # Fetch the full time series in one call, and copy it in one go
+        return ToPythonArray(dataItem.CreateTimeSeriesData(elementIndex))
 
     def GetTimes(self, toTicks=True):
         """
-        Get a list of times
+        Get a list of times, or of their ticks. The ticks are read from
+        the result data once, after it has been loaded, and then cached.
+        The times are only read when asked for, and not cached.
         """
-        timesList = list(self.resultData.TimesList)
-        if toTicks:
-            return list(map(lambda x: x.Ticks, timesList))
-        else:
-            return timesList
+        if not toTicks:
+            return list(self.resultData.TimesList)
+        if self.timeTicks is None:
+            self.timeTicks = [time.Ticks for time in self.resultData.TimesList]
+        return self.timeTicks
 
 #endregion Result finder
 
@@ -533,164 +850,365 @@ class ResultFinder(object):
 class Extractor(object):
     """Base class for data extractors to specified file format"""
 
-    def __init__(self, outFileName, outputData, resultData, timeStepSkippingNumber=1):
+    def __init__(self, outFileName, outputData, resultData, timeStepSkippingNumber=1, fromTime=None, toTime=None, halfPrecision=False, timeTicks=None):
         self.outFileName = outFileName
         self.outputData = outputData
         self.resultData = resultData
         self.timeStepSkippingNumber = timeStepSkippingNumber
+        self.fromTime = fromTime
+        self.toTime = toTime
+        self.halfPrecision = halfPrecision
+        self.timeTicks = timeTicks
+        self.series = None
 
-    @staticmethod
-    def Create(outFileType, outFileName, outputData, resultData, timeStepSkippingNumber=1):
-        if outFileType == OutputFileType.TXT:
-            return ExtractorTxt(outFileName, outputData, resultData, timeStepSkippingNumber)
-
-        elif outFileType == OutputFileType.CSV:
-            return ExtractorCsv(outFileName, outputData, resultData, timeStepSkippingNumber)
-
-        elif outFileType == OutputFileType.DFS0:
-            return ExtractorDfs0(outFileName, outputData, resultData, timeStepSkippingNumber)
+    def ReadDataItems(self):
+        """
+        Read item info and time series of all data entries into memory,
+        fetching the time series of the entries in parallel, and find the
+        range of time steps to extract. Nothing is read if the data has
+        already been read or shared.
+        """
+        if self.series is not None:
+            return
 
-        elif outFileType == OutputFileType.ALL:
-            return ExtractorAll(outFileName, outputData, resultData, timeStepSkippingNumber)
+        self.ReadItemInfo()
 
-        return None
+        outputData = self.outputData
+        series = [None] * len(outputData)
 
+        def ReadDataEntry(j):
+            series[j] = outputData[j].GetTimeSeries()
 
-class ExtractorAll(object):
-    """Class which extracts data into all supported file formats"""
+        # Data entries are independent and result data is only read, so
+        # time series can be fetched in parallel
+        Parallel.For(0, len(outputData), Action[int](ReadDataEntry))
 
-    def __init__(self, outFileName, outputData, resultData, timeStepSkippingNumber=1):
-        self.allExtractors = [
-            ExtractorTxt(outFileName.replace(".-", ".txt"), outputData, resultData, timeStepSkippingNumber),
-            ExtractorCsv(outFileName.replace(".-", ".csv"), outputData, resultData, timeStepSkippingNumber),
-            ExtractorDfs0(outFileName.replace(".-", ".dfs0"), outputData, resultData, timeStepSkippingNumber)
-        ]
+        self.series = series
+        if self.timeTicks is None:
+            self.timeTicks = [time.Ticks for time in self.resultData.TimesList]
+        self.firstTimeStepIndex, self.endTimeStepIndex = self.GetTimeStepRange()
 
-    def Export(self):
-        for extractor in self.allExtractors:
-            extractor.Export()
+    def ShareDataItems(self, extractor):
+        """
+        Use item info and time series already read by another extractor
+        of the same data entries and period
+        """
+        self.itemTypes = extractor.itemTypes
+        self.quantityIds = extractor.quantityIds
+        self.locationIds = extractor.locationIds
+        self.chainages = extractor.chainages
+        self.series = extractor.series
+        self.timeTicks = extractor.timeTicks
+        self.firstTimeStepIndex = extractor.firstTimeStepIndex
+        self.endTimeStepIndex = extractor.endTimeStepIndex
+
+    def GetTimeStepRange(self):
+        """
+        Get index of the first time step and one past the last time step
+        within the period given by fromTime and toTime. The result data
+        filter normally loads only that period already, this trims any
+        time steps outside of it that were loaded anyway.
+        """
+        ticks = self.timeTicks
+        firstIndex = 0
+        endIndex = len(ticks)
+        if self.fromTime is not None:
+            firstIndex = bisect_left(ticks, self.fromTime.Ticks)
+        if self.toTime is not None:
+            endIndex = max(firstIndex, bisect_right(ticks, self.toTime.Ticks))
+        return firstIndex, endIndex
+
+    def GetStartTime(self):
+        """
+        Get time of the first time step to extract
+        """
+        if self.firstTimeStepIndex < self.endTimeStepIndex:
+            return self.resultData.TimesList[self.firstTimeStepIndex]
+        return self.resultData.StartTime
 
+    def GetTimesInSeconds(self, timeStepIndices):
+        """
+        Get times of the given time steps, in seconds since the start time.
+        Computed from the time step ticks, without any DateTime arithmetic.
+        """
+        ticks = self.timeTicks
+        startTicks = self.GetStartTime().Ticks
+        return [(ticks[timeStepIndex] - startTicks) / 1e7 for timeStepIndex in timeStepIndices]
 
-class ExtractorTxt(Extractor):
-    """Class which extracts data to text file"""
+    def GetTimeStepSlice(self):
+        """
+        Get slice of the time steps to extract. Every time step skipping
+        number'th time step is extracted, starting with the first one.
+        """
+        return slice(self.firstTimeStepIndex, self.endTimeStepIndex, self.timeStepSkippingNumber)
 
-    def Export(self):
-        self.f = open(self.outFileName, 'w')
-        self.SetOutputFormat()
-        self.WriteItemType()
-        self.WriteQuantity()
-        self.WriteName()
-        self.WriteChainage()
-        self.WriteDataItems()
-        self.f.close()
+    def GetTimeStepIndices(self):
+        """
+        Get indices of the time steps to extract
+        """
+        timeStepSlice = self.GetTimeStepSlice()
+        return list(range(timeStepSlice.start, timeStepSlice.stop, timeStepSlice.step))
 
-    def SetOutputFormat(self):
-        self.header1Format = "%-20s"
-        self.header2Format = "%15s"
-        self.chainageFormat = "%15s"
-        self.chainageFormatcs = "{0,15:0.00}"
-        self.dataFormat = "%15s"
-        self.dataFormatcs = "{0,15:0.000000}"
+    def GetColumns(self):
+        """
+        Get values of the time steps to extract, one column per data entry.
+        Python arrays are sliced in one operation, other sequences are indexed.
+        """
+        timeStepSlice = self.GetTimeStepSlice()
+        timeStepIndices = self.GetTimeStepIndices()
+        columns = []
+        for values in self.series:
+            if isinstance(values, array):
+                columns.append(values[timeStepSlice])
+            else:
+                columns.append(array('f', [values[timeStepIndex] for timeStepIndex in timeStepIndices]))
+        return columns
 
-    def WriteItemType(self):
-        outputData, f = self.outputData, self.f
-        header1Format, header2Format = self.header1Format, self.header2Format
+    def ReadItemInfo(self):
+        """
+        Read type, quantity id, location id and chainage of all data entries
+        into lists, so the .NET properties are fetched once per data entry
+        """
+        resultData = self.resultData
+        reaches = list(resultData.Reaches)
+        nodes = list(resultData.Nodes)
+        catchments = list(resultData.Catchments)
+        # Grid point chainages per reach number, shared by all entries on the reach
+        reachChainages = {}
+        # Grid point index of each element, per data item
+        indexLists = {}
 
-        f.write(header1Format % "Type")
-        for dataEntry in outputData:
-            itemTypeGroup = dataEntry.dataItem.ItemTypeGroup
+        itemTypes, quantityIds, locationIds, chainages = [], [], [], []
+        for dataEntry in self.outputData:
+            dataItem = dataEntry.dataItem
+            itemTypeGroup = dataItem.ItemTypeGroup
+            numberWithinGroup = dataItem.NumberWithinGroup
+            locationId = None
+            chainage = None
 
             if itemTypeGroup == ItemTypeGroup.ReachItem:
-                f.write(header2Format % "Reach")
+                itemType = LocationType.REACH
+                reach = reaches[numberWithinGroup]
+                locationId = reach.Name
+                indexList = indexLists.get(dataItem)
+                if indexList is None:
+                    netIndexList = dataItem.IndexList
+                    indexList = list(netIndexList) if netIndexList is not None else []
+                    indexLists[dataItem] = indexList
+
+                if indexList:
+                    gridPointChainages = reachChainages.get(numberWithinGroup)
+                    if gridPointChainages is None:
+                        gridPointChainages = [gridPoint.Chainage for gridPoint in reach.GridPoints]
+                        reachChainages[numberWithinGroup] = gridPointChainages
+                    chainage = gridPointChainages[indexList[dataEntry.elementIndex]]
 
             elif itemTypeGroup == ItemTypeGroup.NodeItem:
-                f.write(header2Format % "Node")
+                itemType = LocationType.NODE
+                locationId = nodes[numberWithinGroup].Id
 
             elif itemTypeGroup == ItemTypeGroup.CatchmentItem:
-                f.write(header2Format % "Catchment")
+                itemType = LocationType.CATCHMENT
+                locationId = catchments[numberWithinGroup].Id
 
             else:
-                f.write(header2Format % itemTypeGroup)
-        f.write("\n")
+                itemType = str(itemTypeGroup)
 
-    def WriteQuantity(self):
-        outputData, f = self.outputData, self.f
-        header1Format, header2Format = self.header1Format, self.header2Format
+            itemTypes.append(itemType)
+            quantityIds.append(dataItem.Quantity.Id)
+            locationIds.append(locationId)
+            chainages.append(chainage)
 
-        f.write(header1Format % "Quantity")
-        for dataEntry in outputData:
-            f.write(header2Format % dataEntry.dataItem.Quantity.Id),
-        f.write("\n")
+        self.itemTypes = itemTypes
+        self.quantityIds = quantityIds
+        self.locationIds = locationIds
+        self.chainages = chainages
 
-    def WriteName(self):
-        outputData, f = self.outputData, self.f
-        resultData = self.resultData
-        header1Format, header2Format = self.header1Format, self.header2Format
+    def GetItemNames(self):
+        """
+        Get names of all data entries, e.g. reach:WaterLevel:102l1:123.000
+        """
+        itemNames = []
+        for j, itemType in enumerate(self.itemTypes):
+            quantityId, locationId, chainage = self.quantityIds[j], self.locationIds[j], self.chainages[j]
 
-        f.write(header1Format % "Name"),
-        nodes = list(resultData.Nodes)
-        reaches = list(resultData.Reaches)
-        catchments = list(resultData.Catchments)
-        for dataEntry in outputData:
-            dataItem = dataEntry.dataItem
-            itemTypeGroup = dataItem.ItemTypeGroup
-            numberWithinGroup = dataItem.NumberWithinGroup
+            if itemType == LocationType.REACH and chainage is not None:
+                itemName = "reach:%s:%s:%.3f" % (quantityId, locationId, chainage)
 
-            if itemTypeGroup == ItemTypeGroup.ReachItem:
-                f.write(header2Format % reaches[numberWithinGroup].Name),
+            elif locationId is not None:
+                itemName = "%s:%s:%s" % (itemType.lower(), quantityId, locationId)
 
-            elif itemTypeGroup == ItemTypeGroup.NodeItem:
-                f.write(header2Format % nodes[numberWithinGroup].Id),
+            else:
+                itemName = "%s:%s:%s" % (itemType, quantityId, self.outputData[j].dataItem.Id)
 
-            elif itemTypeGroup == ItemTypeGroup.CatchmentItem:
-                f.write(header2Format % catchments[numberWithinGroup].Id),
+            itemNames.append(itemName)
 
-            else:
-                f.write(header2Format % "-"),
-        f.write("\n")
+        return itemNames
 
-    def WriteChainage(self):
-        outputData, f = self.outputData, self.f
-        resultData = self.resultData
-        header1Format, header2Format = self.header1Format, self.header2Format
-        chainageFormat, chainageFormatcs = self.chainageFormat, self.chainageFormatcs
+    @staticmethod
+    def FormatTicks(ticks):
+        """
+        Format .NET DateTime ticks as yyyy-MM-dd HH:mm:ss, in Python
+        """
+        time = datetime(1, 1, 1) + timedelta(microseconds=ticks // 10)
+        return "%04d-%02d-%02d %02d:%02d:%02d" % (time.year, time.month, time.day, time.hour, time.minute, time.second)
 
-        f.write(header1Format % "Chainage"),
-        for dataEntry in outputData:
-            dataItem = dataEntry.dataItem
-            elementIndex = dataEntry.elementIndex
+    @staticmethod
+    def ToNetArray(values):
+        """
+        Copy a Python array of type 'f' or 'd' into a new .NET float or double
+        array. With pythonnet this is a single memory copy, with IronPython
+        the array is created from the values in one call.
+        """
+        netType = System.Double if values.typecode == 'd' else System.Single
+        if isIronPython:
+            return Array[netType](values)
 
-            if dataItem.ItemTypeGroup != ItemTypeGroup.ReachItem or dataItem.IndexList is None:
-                f.write(header2Format % "-"),
-                continue
+        netArray = Array.CreateInstance(netType, len(values))
+        address, length = values.buffer_info()
+        Marshal.Copy(IntPtr(Int64(address)), netArray, 0, length)
+        return netArray
 
-            indexList = list(dataItem.IndexList)
-            reaches = list(resultData.Reaches)
-            gridPoints = list(reaches[dataItem.NumberWithinGroup].GridPoints)
-            gridPointIndex = indexList[elementIndex]
-            f.write(chainageFormat % System.String.Format(chainageFormatcs, gridPoints[gridPointIndex].Chainage)),
+    @staticmethod
+    def CopyToNetArray(values, netArray):
+        """
+        Copy a Python array of type 'd' into an existing .NET double array,
+        which may be multidimensional. With pythonnet the .NET array is
+        pinned and filled with a single memory copy, without an intermediate
+        .NET array.
+        """
+        numberOfBytes = values.itemsize * len(values)
+        if isIronPython:
+            Buffer.BlockCopy(Extractor.ToNetArray(values), 0, netArray, 0, numberOfBytes)
+            return
 
-        f.write("\n")
+        handle = GCHandle.Alloc(netArray, GCHandleType.Pinned)
+        try:
+            address = values.buffer_info()[0]
+            ctypes.memmove(handle.AddrOfPinnedObject().ToInt64(), address, numberOfBytes)
+        finally:
+            handle.Free()
 
-    def WriteDataItems(self):
-        outputData, f = self.outputData, self.f
-        resultData = self.resultData
-        header1Format, dataFormat, dataFormatcs = self.header1Format, self.dataFormat, self.dataFormatcs
+    @staticmethod
+    def Create(outFileType, outFileName, outputData, resultData, timeStepSkippingNumber=1, fromTime=None, toTime=None, halfPrecision=False, timeTicks=None):
+        extractorClass = {
+            OutputFileType.TXT: ExtractorTxt,
+            OutputFileType.CSV: ExtractorCsv,
+            OutputFileType.DFS0: ExtractorDfs0,
+            OutputFileType.BIN: ExtractorBin,
+            OutputFileType.ALL: ExtractorAll,
+        }.get(outFileType)
+
+        if extractorClass is None:
+            return None
 
-        times = list(resultData.TimesList)
-        # Write data
-        for timeStepIndex in range(resultData.NumberOfTimeSteps):
-            if (timeStepIndex % self.timeStepSkippingNumber != 0):
-                continue
+        return extractorClass(outFileName, outputData, resultData, timeStepSkippingNumber, fromTime, toTime, halfPrecision, timeTicks)
+
+
+class ExtractorAll(object):
+    """
+    Class which extracts data into all supported file formats, i.e. txt,
+    csv, dfs0 and bin.
+    """
+
+    def __init__(self, outFileName, outputData, resultData, timeStepSkippingNumber=1, fromTime=None, toTime=None, halfPrecision=False, timeTicks=None):
+        self.allExtractors = [
+            ExtractorTxt(outFileName.replace(".-", ".txt"), outputData, resultData, timeStepSkippingNumber, fromTime, toTime, timeTicks=timeTicks),
+            ExtractorCsv(outFileName.replace(".-", ".csv"), outputData, resultData, timeStepSkippingNumber, fromTime, toTime, timeTicks=timeTicks),
+            ExtractorDfs0(outFileName.replace(".-", ".dfs0"), outputData, resultData, timeStepSkippingNumber, fromTime, toTime, halfPrecision, timeTicks),
+            ExtractorBin(outFileName.replace(".-", ".bin"), outputData, resultData, timeStepSkippingNumber, fromTime, toTime, timeTicks=timeTicks)
+        ]
 
-            time = times[timeStepIndex]
-            f.write(header1Format  % (time.ToString("yyyy-MM-dd HH:mm:ss"))),
-            for dataEntry in outputData:
-                dataItem = dataEntry.dataItem
-                elementIndex = dataEntry.elementIndex
-                value = dataItem.GetValue(timeStepIndex, elementIndex)
-                f.write(dataFormat % System.String.Format(dataFormatcs, value)),
-            f.write("\n")
+    def Export(self):
+        # Read the data once, and share it with the other extractors
+        firstExtractor = self.allExtractors[0]
+        firstExtractor.ReadDataItems()
+        for extractor in self.allExtractors[1:]:
+            extractor.ShareDataItems(firstExtractor)
+
+        for extractor in self.allExtractors:
+            extractor.Export()
+
+
+class ExtractorTxt(Extractor):
+    """Class which extracts data to text file"""
+
+    def Export(self):
+        # Large buffer, so the output is written in few large chunks.
+        # Everything is on disk only when the file is closed.
+        # The file is binary, text is encoded here with the line separator
+        # and encoding a text mode file would use.
+        self.f = open(self.outFileName, 'wb', 1 << 20)
+        self.newline = os.linesep
+        self.encoding = locale.getpreferredencoding(False)
+        self.SetOutputFormat()
+        self.ReadDataItems()
+        self.WriteHeader()
+        self.WriteDataItems()
+        self.f.close()
+
+    def SetOutputFormat(self):
+        self.header1Format = "%-20s"
+        self.header2Format = "%15s"
+        self.chainageFormat = "%15.2f"
+        self.dataFormat = "%15.6f"
+
+    def WriteHeader(self):
+        """
+        Write the Type, Quantity, Name and Chainage header lines, built in
+        one pass over the data entries and written in one go
+        """
+        header1Format, header2Format = self.header1Format, self.header2Format
+        chainageFormat = self.chainageFormat
+
+        typeRow = [header1Format % "Type"]
+        quantityRow = [header1Format % "Quantity"]
+        nameRow = [header1Format % "Name"]
+        chainageRow = [header1Format % "Chainage"]
+
+        for itemType, quantityId, locationId, chainage in zip(self.itemTypes, self.quantityIds, self.locationIds, self.chainages):
+            typeRow.append(header2Format % itemType)
+            quantityRow.append(header2Format % quantityId)
+            nameRow.append(header2Format % (locationId if locationId is not None else "-"))
+            if chainage is None:
+                chainageRow.append(header2Format % "-")
+            else:
+                chainageRow.append(chainageFormat % chainage)
+
+        newline = self.newline
+        self.Write(newline.join(["".join(typeRow), "".join(quantityRow), "".join(nameRow), "".join(chainageRow), ""]))
+
+    def Write(self, text):
+        self.f.write(text.encode(self.encoding))
+
+    def WriteDataItems(self):
+        f = self.f
+        header1Format, dataFormat = self.header1Format, self.dataFormat
+        encoding = self.encoding
+
+        # Time steps to write and their time stamps, found before the loop
+        timeStepIndices = self.GetTimeStepIndices()
+        ticks = self.timeTicks
+        timeStrings = [header1Format % self.FormatTicks(ticks[timeStepIndex])
+                       for timeStepIndex in timeStepIndices]
+
+        # Format string for all values of a row, so each row is
+        # formatted by a single % operation
+        columns = self.GetColumns()
+        rowFormat = "%s" + dataFormat * len(columns) + self.newline
+
+        # Write data, rows are encoded and written in blocks of about 64 KB,
+        # sized from the first row. The columns are turned into rows of values by zip.
+        rowsPerBlock = 1
+        if timeStepIndices:
+            firstRow = rowFormat % ((timeStrings[0],) + tuple(column[0] for column in columns))
+            rowsPerBlock = max(1, (1 << 16) // len(firstRow))
+        for blockStart in range(0, len(timeStepIndices), rowsPerBlock):
+            blockEnd = blockStart + rowsPerBlock
+            rows = zip(*[column[blockStart:blockEnd] for column in columns])
+            block = [rowFormat % ((timeString,) + row)
+                     for timeString, row in zip(timeStrings[blockStart:blockEnd], rows)]
+            f.write("".join(block).encode(encoding))
 
 
 class ExtractorCsv(ExtractorTxt):
@@ -699,30 +1217,36 @@ class ExtractorCsv(ExtractorTxt):
     separator = ';'
 
     def SetOutputFormat(self):
+        # Same number of significant digits as .NET "g" format of double and float
         self.header1Format = "%s;"
         self.header2Format = "%s;"
-        self.chainageFormat = "%s;"
-        self.chainageFormatcs = "{0:g}"
-        self.dataFormat = "%s;"
-        self.dataFormatcs = "{0:g}"
+        self.chainageFormat = "%.15g;"
+        self.dataFormat = "%.7g;"
 
-    def WriteItemType(self):
+    def WriteHeader(self):
         # Write CSV separator type
-        self.f.write("sep=%s\n" % self.separator)
-        ExtractorTxt.WriteItemType(self)
+        self.Write("sep=%s%s" % (self.separator, self.newline))
+        ExtractorTxt.WriteHeader(self)
 
 
 class ExtractorDfs0(Extractor):
     """Class which extracts data to dfs0 file format"""
 
     def Export(self):
+        clr.AddReference("DHI.Generic.MikeZero.DFS")
+        clr.AddReference("DHI.Generic.MikeZero.EUM")
+        from DHI.Generic.MikeZero.DFS import DfsFactory
+
+        self.ReadDataItems()
         self.factory = DfsFactory()
         self.builder = self.CreateDfsBuilder()
         self.DefineDynamicDataItems()
         self.WriteDataItems()
 
     def CreateDfsBuilder(self):
-        resultData = self.resultData
+        from DHI.Generic.MikeZero import eumUnit
+        from DHI.Generic.MikeZero.DFS import DfsBuilder, StatType
+
         factory = self.factory
 
         builder = DfsBuilder.Create("ResultDataExtractor-script", "MIKE SDK", 100)
@@ -730,78 +1254,122 @@ class ExtractorDfs0(Extractor):
         # Set up file header
         builder.SetDataType(1)
         builder.SetGeographicalProjection(factory.CreateProjectionUndefined())
-        builder.SetTemporalAxis(factory.CreateTemporalNonEqCalendarAxis(eumUnit.eumUsec, resultData.StartTime))
+        builder.SetTemporalAxis(factory.CreateTemporalNonEqCalendarAxis(eumUnit.eumUsec, self.GetStartTime()))
         builder.SetItemStatisticsType(StatType.NoStat)
 
         return builder
 
     def DefineDynamicDataItems(self):
-        outputData = self.outputData
-        resultData = self.resultData
-        builder = self.builder
+        from DHI.Generic.MikeZero.DFS import DfsSimpleType, DataValueType
 
-        for dataEntry in outputData:
-            dataItem = dataEntry.dataItem
-            elementIndex = dataEntry.elementIndex
-
-            quantity = dataItem.Quantity
-            itemTypeGroup = dataItem.ItemTypeGroup
-            numberWithinGroup = dataItem.NumberWithinGroup
-
-            reaches = list(resultData.Reaches)
-            nodes = list(resultData.Nodes)
-            catchments = list(resultData.Catchments)
-
-            if itemTypeGroup == ItemTypeGroup.ReachItem:
-                reach = reaches[numberWithinGroup]
-                gridPointIndex = dataItem.IndexList[elementIndex]
-                gridPoints = list(reach.GridPoints)
-                chainage = gridPoints[gridPointIndex].Chainage
-                itemName = "reach:%s:%s:%.3f" % (quantity.Id, reach.Name, chainage)
-
-            elif itemTypeGroup == ItemTypeGroup.NodeItem:
-                node = nodes[numberWithinGroup]
-                itemName = "node:%s:%s" % (quantity.Id, node.Id)
+        outputData = self.outputData
+        builder, factory = self.builder, self.factory
+        itemNames = self.GetItemNames()
+        floatType = DfsSimpleType.Float
+        instantaneous = DataValueType.Instantaneous
 
-            elif itemTypeGroup == ItemTypeGroup.CatchmentItem:
-                catchment = catchments[numberWithinGroup]
-                itemName = "catchment:%s:%s" % (quantity.Id, catchment.Id)
+        # EUM quantity per item type and quantity id, elements of a reach share their quantity
+        eumQuantities = {}
 
-            else:
-                itemName = "%s:%s:%s" % (itemTypeGroup, quantityId, dataItem.Id)
+        for dataEntry, itemName, itemType, quantityId in zip(outputData, itemNames, self.itemTypes, self.quantityIds):
+            key = (itemType, quantityId)
+            eumQuantity = eumQuantities.get(key)
+            if eumQuantity is None:
+                eumQuantity = dataEntry.dataItem.Quantity.EumQuantity
+                eumQuantities[key] = eumQuantity
 
             item = builder.CreateDynamicItemBuilder()
-            item.Set(itemName, dataItem.Quantity.EumQuantity, DfsSimpleType.Float)
-            item.SetValueType(DataValueType.Instantaneous)
-            item.SetAxis(self.factory.CreateAxisEqD0())
+            item.Set(itemName, eumQuantity, floatType)
+            item.SetValueType(instantaneous)
+            item.SetAxis(factory.CreateAxisEqD0())
             builder.AddDynamicItem(item.GetDynamicItemInfo())
 
     def WriteDataItems(self):
-        outputData = self.outputData
-        resultData = self.resultData
+        from DHI.Generic.MikeZero.DFS.dfs0 import Dfs0Util
+
         builder = self.builder
 
         # Create file
         builder.CreateFile(self.outFileName)
         dfsfile = builder.GetFile()
-        times = list(resultData.TimesList)
 
-        # Write data to file
-        val = Array.CreateInstance(System.Single, 1)
-        for timeStepIndex in range(resultData.NumberOfTimeSteps):
-            if (timeStepIndex % self.timeStepSkippingNumber != 0):
-                continue
+        timeStepIndices = self.GetTimeStepIndices()
+        timesSec = self.ToNetArray(array('d', self.GetTimesInSeconds(timeStepIndices)))
 
-            time = times[timeStepIndex].Subtract(resultData.StartTime).TotalSeconds
-            for dataEntry in outputData:
-                dataItem = dataEntry.dataItem
-                elementIndex = dataEntry.elementIndex
+        # Collect values of all items, indexed [time step, item]. The columns
+        # are turned into rows by zip, flattened by chain and copied to .NET in bulk.
+        columns = self.GetColumns()
+        values = chain.from_iterable(zip(*columns))
+        if self.halfPrecision:
+            values = map(self.RoundToHalfPrecision, values)
+        rows = array('d', values)
+        data = Array.CreateInstance(System.Double, len(timeStepIndices), len(columns))
+        self.CopyToNetArray(rows, data)
 
-                val[0] = dataItem.GetValue(timeStepIndex, elementIndex)
-                dfsfile.WriteItemTimeStepNext(time, val)
+        # Write data to file, all time steps and items in one call
+        Dfs0Util.WriteDfs0DataDouble(dfsfile, timesSec, data)
 
         dfsfile.Close()
 
+    @staticmethod
+    def RoundToHalfPrecision(value):
+        """
+        Round value to the 11 bit significand of a half precision float.
+        Dfs0 has no half precision type, so the value is still stored as a
+        float, but with fewer distinct values the file compresses better.
+        Values below the smallest normal half precision value, including
+        zero and delete values, as well as NaN and infinite values, are
+        kept unchanged.
+        """
+        if math.isnan(value) or math.isinf(value) or abs(value) < 6.103515625e-05:
+            return value
+        mantissa, exponent = math.frexp(value)
+        return math.ldexp(round(mantissa * 2048) / 2048, exponent)
+
+
+class ExtractorBin(Extractor):
+    """
+    Class which extracts data to a little-endian binary file, with layout:
+        int32   : Number of time steps
+        int32   : Number of items
+        int32   : Length of header in bytes
+        byte[]  : Header, UTF-8 encoded JSON with start time and item names
+        float64 : Time of each time step, in seconds since start time
+        float32 : Values, one row of all items for each time step
+    """
+
+    def Export(self):
+        self.ReadDataItems()
+        self.f = open(self.outFileName, 'wb', 1 << 20)
+        self.timeStepIndices = self.GetTimeStepIndices()
+        self.WriteHeader()
+        self.WriteTimes()
+        self.WriteDataItems()
+        self.f.close()
+
+    def WriteHeader(self):
+        header = {
+            "startTime": self.GetStartTime().ToString("yyyy-MM-dd HH:mm:ss"),
+            "items": self.GetItemNames()
+        }
+        headerBytes = json.dumps(header).encode('utf-8')
+        self.f.write(struct.pack('<iii', len(self.timeStepIndices), len(self.series), len(headerBytes)))
+        self.f.write(headerBytes)
+
+    def WriteTimes(self):
+        timesSec = array('d', self.GetTimesInSeconds(self.timeStepIndices))
+        self.WriteArray(timesSec)
+
+    def WriteDataItems(self):
+        # All rows of values in one array, written in one go
+        rows = array('f', chain.from_iterable(zip(*self.GetColumns())))
+        self.WriteArray(rows)
+
+    def WriteArray(self, values):
+        if sys.byteorder != 'little':
+            values.byteswap()
+        values.tofile(self.f)
+
 #endregion Extractor classes
 
 
@@ -813,6 +1381,10 @@ def Main(arguments):
         PrintUsage()
         return
 
+    # All arguments are parsed, stop before opening the result file if any is invalid
+    if parser.cannotHandleArgument:
+        return
+
     # Setup result finder
     resultFinder = ResultFinder(parser.resFileName, useFilter=True)
 
@@ -822,10 +1394,8 @@ def Main(arguments):
         resultFinder.PrintAllQuantities()
         return
 
-    if parser.cannotHandleArgument:
-        return
-
-    # Create a location filter, which is used to load a result file
+    # Listings only need the file header, which is already loaded.
+    # Handle them before any location is added, so no data is loaded.
     for p in parser.parsedArguments:
         locationType, locationId, chainage  = p.locationType, p.locationId, p.chainage
 
@@ -839,7 +1409,14 @@ def Main(arguments):
             resultFinder.PrintQuantities(locationType, locationId, chainage)
             return
 
-        resultFinder.AddLocation(locationType,  locationId)
+    # Create a location and quantity filter, which is used to load a result file
+    for p in parser.parsedArguments:
+        resultFinder.AddLocation(p.locationType, p.locationId)
+        resultFinder.AddQuantity(p.quantityId)
+
+    # Load only the time steps of the wanted period and stride
+    resultFinder.SetPeriod(parser.fromTime, parser.toTime)
+    resultFinder.SetLoadStep(parser.timeStepSkippingNumber)
 
     # Load the actual data into memory
     resultFinder.Load()
@@ -850,11 +1427,15 @@ def Main(arguments):
         locationType, quantityId, locationId, chainage  = p.locationType, p.quantityId, p.locationId, p.chainage
 
         dataEntries = resultFinder.FindQuantityInLocation(locationType, quantityId, locationId, chainage)
-        for dataEntry in dataEntries:
-            outputData.append(dataEntry)
-
-    # Export the data in a wanted format
-    exporter = Extractor.Create(parser.outFileType, parser.outFileName, outputData, resultFinder.resultData)
+        if dataEntries:
+            outputData.extend(dataEntries)
+
+    # Export the data in a wanted format. Time steps are already skipped
+    # when loading, so every loaded time step is extracted.
+    exporter = Extractor.Create(parser.outFileType, parser.outFileName, outputData, resultFinder.resultData,
+                                fromTime=parser.fromTime, toTime=parser.toTime,
+                                halfPrecision=parser.halfPrecision,
+                                timeTicks=resultFinder.GetTimes())
     exporter.Export()
 
 